@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Compare size and load time of the signature files for each codec
+
+Usage: python benchmarks/bench_codecs.py [module ...]
+"""
+
+import sys
+import time
+import os.path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import samarche  # noqa
+
+
+STDLIB_CORPUS = [
+    'argparse', 'collections', 'csv', 'datetime', 'decimal', 'difflib',
+    'email', 'enum', 'fractions', 'functools', 'ipaddress', 'itertools',
+    'json', 'pickle', 're', 'sqlite3', 'statistics', 'string', 'tempfile',
+    'textwrap', 'threading', 'urllib.parse'
+]
+
+
+def bench(targets, rounds=5):
+    signatures = [samarche.build_signature(t) for t in targets]
+    print('%-6s %12s %8s %12s' % ('codec', 'size (B)', 'ratio', 'load (ms)'))
+    raw_size = None
+    for codec in [None] + sorted(samarche.CODECS):
+        data = [samarche.dumps(s, codec=codec) for s in signatures]
+        size = sum(len(d) for d in data)
+        raw_size = raw_size or size
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for d in data:
+                samarche.loads(d)
+        elapsed = (time.perf_counter() - start) / rounds
+        print('%-6s %12d %7.1fx %12.2f' % (
+            codec or 'raw', size, raw_size / size, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    bench(sys.argv[1:] or STDLIB_CORPUS)
@@ -1,8 +1,25 @@
+from collections import namedtuple
+from contextlib import contextmanager
 from importlib import import_module
 import inspect
-
-# Republishing for easy serialization
-from pickle import load, loads, dump, dumps  # noqa
+import io
+import json
+import pickle
+import threading
+
+# Compression modules are optional in Python builds
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
+try:
+    import zlib
+except ImportError:
+    zlib = None
 
 
 def import_string(dotted_path):
@@ -32,7 +49,7 @@ def signature_factory(target):
         return ModuleSignature(target)
     elif inspect.isclass(target):
         return ClassSignature(target)
-    elif inspect.isfunction(target):
+    elif inspect.isfunction(target) or inspect.isbuiltin(target):
         return FunctionSignature(target)
     elif inspect.isgenerator(target) or inspect.isgeneratorfunction(target):
         return GeneratorSignature(target)
@@ -40,8 +57,160 @@ def signature_factory(target):
         return AttributeSignature(target)
 
 
+# Argspec records shared by every function built during a single
+# `build_signature` call, per thread so concurrent builds don't mix
+_argspec_local = threading.local()
+
+
+def _current_argspec_cache():
+    """
+    Return the argspec cache of the running build (None if no build)
+    """
+    return getattr(_argspec_local, 'cache', None)
+
+
+def _argspec_owner(target):
+    return (getattr(target, '__defaults__', None),
+            getattr(target, '__kwdefaults__', None) or None,
+            getattr(target, '__annotations__', None) or None)
+
+
+def _same_mapping(mapping, cached_mapping):
+    if mapping is None or cached_mapping is None:
+        return mapping is cached_mapping
+    if mapping.keys() != cached_mapping.keys():
+        return False
+    # Compare types too given `1 == True == 1.0`
+    return all(type(v) is type(cached_mapping[k]) and v == cached_mapping[k]
+               for k, v in mapping.items())
+
+
+def _same_argspec_owner(owner, cached_owner):
+    # Each function object gets its own `__annotations__` dict (and
+    # `functools.wraps` copies the wrapped one), so compare by value
+    defaults, kwdefaults, annotations = owner
+    cached_defaults, cached_kwdefaults, cached_annotations = cached_owner
+    try:
+        return (defaults is cached_defaults and
+                _same_mapping(kwdefaults, cached_kwdefaults) and
+                _same_mapping(annotations, cached_annotations))
+    except (TypeError, ValueError):
+        # Values with exotic comparison (e.g. arrays as default)
+        return False
+
+
+def _extract_argspec(target):
+    """
+    Return the argspec record of a function or builtin, or None if it
+    cannot be introspected (i.e. C function without `__text_signature__`)
+
+    Records are cached by code object, so aliases, shared decorator
+    wrappers and methods reached through several classes are only
+    introspected once
+    """
+    cache = _current_argspec_cache()
+    if cache is None:
+        return _build_argspec(target)
+    key = getattr(target, '__code__', target)
+    owner = _argspec_owner(target)
+    try:
+        cached_owner, record = cache[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Unhashable builtin, don't cache it
+        return _build_argspec(target)
+    else:
+        # Same code can be bound to different defaults (e.g. closures)
+        if _same_argspec_owner(owner, cached_owner):
+            return record
+    record = _build_argspec(target)
+    cache[key] = (owner, record)
+    return record
+
+
+def _build_argspec(target):
+    try:
+        # Builtins are handled through their `__text_signature__`
+        argspec = inspect.getfullargspec(target)
+    except TypeError:
+        return None
+    record = {
+        "args": argspec.args,
+        "varargs": argspec.varargs,
+        "varkw": argspec.varkw,
+        "kwonlyargs": argspec.kwonlyargs
+    }
+    if argspec.defaults:
+        if isinstance(argspec.defaults, list):
+            record["defaults"] = (signature_factory(d)
+                                  for d in argspec.defaults)
+        else:
+            record["defaults"] = signature_factory(argspec.defaults)
+    if argspec.kwonlydefaults:
+        record["kwonlydefaults"] = {
+            k: signature_factory(v)
+            for k, v in argspec.kwonlydefaults.items()}
+    if argspec.annotations:
+        record["annotations"] = {
+            k: signature_factory(v)
+            for k, v in argspec.annotations.items()}
+    return record
+
+
+@contextmanager
+def _argspec_cache_scope(argspec_cache):
+    previous_cache = _current_argspec_cache()
+    _argspec_local.cache = argspec_cache
+    try:
+        yield
+    finally:
+        _argspec_local.cache = previous_cache
+
+
+class Change(namedtuple('Change', ('path', 'kind', 'original', 'current'))):
+    """
+    A single difference between the original and the current API
+    :attr path: tuple of the member names leading to the element
+    :attr kind: type of the change (e.g. 'missing element')
+    :attr original: original :class Signature: of the element, if any
+    :attr current: current :class Signature: of the element, if any
+    """
+
+    @property
+    def dotted_path(self):
+        return '.'.join(self.path) or '<root>'
+
+    def as_dict(self):
+        return {
+            'path': self.dotted_path,
+            'kind': self.kind,
+            'original': None if self.original is None else str(self.original),
+            'current': None if self.current is None else str(self.current)
+        }
+
+    def __str__(self):
+        details = ', '.join('%s: %s' % (k, v) for k, v in
+                            (('original', self.original),
+                             ('current', self.current)) if v is not None)
+        return '%s: %s (%s)' % (self.dotted_path, self.kind, details)
+
+
 class ValidationError(Exception):
-    pass
+    """
+    Raised when the API doesn't match the signature, the differences are
+    kept as :class Change: in `changes` and only rendered on demand
+    """
+
+    def __init__(self, changes):
+        super().__init__(changes)
+        self.changes = changes
+
+    def __str__(self):
+        return '\n'.join(str(c) for c in self.changes)
+
+    def to_json(self):
+        return json.dumps([c.as_dict() for c in self.changes])
 
 
 class Signature:
@@ -59,10 +228,14 @@ class Signature:
     def build_signature(self, target):
         self._name = target.__name__
 
-    def validate(self, signature):
-        if self.__class__ != signature.__class__:
-            return ('type mismatch (orginal: %s, actual: %s)' %
-                    (self, signature))
+    def validate(self, original, path=()):
+        """
+        Return the list of :class Change: between original and self
+        :arg path: member names leading to this signature
+        """
+        if self.__class__ != original.__class__:
+            return [Change(path, 'type mismatch', original, self)]
+        return []
 
     def __eq__(self, other):
         return not self.validate(other)
@@ -80,27 +253,34 @@ class NodeSignature(Signature):
 
     def build_signature(self, target):
         super().build_signature(target)
-        public_attrs = (m for m in dir(target) if not m.startswith('_'))
-        for attr in public_attrs:
-            self._signature[attr] = signature_factory(getattr(target, attr))
-
-    def validate(self, original):
-        errors = super().validate(original)
+        for attr, value in self.public_members(target):
+            self._signature[attr] = signature_factory(value)
+
+    @staticmethod
+    def public_members(target):
+        """
+        Iterate over the (name, value) of the public members of target
+        """
+        for attr in dir(target):
+            if not attr.startswith('_'):
+                yield attr, getattr(target, attr)
+
+    def validate(self, original, path=()):
+        errors = super().validate(original, path)
         if errors:
             return errors
-        errors = {}
         original_keys = original._signature.keys()
         keys = self._signature.keys()
-        errors.update({str(original._signature[m]): 'missing element'
-                       for m in original_keys - keys})
-        errors.update({str(self._signature[u]): 'unknown element'
-                       for u in keys - original_keys})
-        for key in original_keys & keys:
-            err = self._signature[key].validate(original._signature[key])
-            if err:
-                errors[str(self._signature[key])] = err
-        if errors:
-            return errors
+        errors = [Change(path + (m, ), 'missing element',
+                         original._signature[m], None)
+                  for m in sorted(original_keys - keys)]
+        errors += [Change(path + (u, ), 'unknown element',
+                          None, self._signature[u])
+                   for u in sorted(keys - original_keys)]
+        for key in sorted(original_keys & keys):
+            errors += self._signature[key].validate(original._signature[key],
+                                                    path + (key, ))
+        return errors
 
 
 class ModuleSignature(NodeSignature):
@@ -124,50 +304,28 @@ class FunctionSignature(LeafSignature):
 
     def build_signature(self, target):
         super().build_signature(target)
-        self._built_in_function = False
-        self._signature = None
-        try:
-            argspec = inspect.getfullargspec(target)
-            self._signature = {
-                "args": argspec.args,
-                "varargs": argspec.varargs,
-                "varkw": argspec.varkw,
-                "kwonlyargs": argspec.kwonlyargs
-            }
-            if argspec.defaults:
-                if isinstance(argspec.defaults, list):
-                    self._signature["defaults"] = (signature_factory(d)
-                                                   for d in argspec.defaults)
-                else:
-                    self._signature["defaults"] = signature_factory(
-                        argspec.defaults)
-            if argspec.kwonlydefaults:
-                self._signature["kwonlydefaults"] = {
-                    k: signature_factory(v)
-                    for k, v in argspec.kwonlydefaults.items()}
-            if argspec.annotations:
-                self._signature["annotations"] = {
-                    k: signature_factory(v)
-                    for k, v in argspec.annotations.items()}
-            # Serialize params
-        except TypeError:
-            # Cannot use metaprogramming on C functions
-            self._built_in_function = True
+        self._signature = _extract_argspec(target)
+        # Functions that cannot be introspected are opaque like C functions
+        self._built_in_function = (inspect.isbuiltin(target) or
+                                   self._signature is None)
 
     def __str__(self):
-        if self._built_in_function:
+        if self._signature is None:
             return 'Function %s <built-in function>' % self._name
+        elif self._built_in_function:
+            return 'Function %s (%s) <built-in function>' % (
+                self._name, self._signature)
         else:
             return 'Function %s (%s)' % (self._name, self._signature)
 
-    def validate(self, original):
-        errors = super().validate(original)
+    def validate(self, original, path=()):
+        errors = super().validate(original, path)
         if errors:
             return errors
         if (self._built_in_function != original._built_in_function or
                 self._signature != original._signature):
-            return ("Function signature has changed, original: %s, actual %s" %
-                    (self, original))
+            return [Change(path, 'function signature changed', original, self)]
+        return []
 
 
 class AttributeSignature(LeafSignature):
@@ -179,16 +337,16 @@ class AttributeSignature(LeafSignature):
     def build_signature(self, target):
         self._type = type(target).__name__
 
-    def validate(self, original):
-        errors = super().validate(original)
+    def validate(self, original, path=()):
+        errors = super().validate(original, path)
         if errors:
             return errors
         if self._type != original._type:
-            return ("Attribute type has changed: original %s, actual %s" %
-                    (self._type, original._type))
+            return [Change(path, 'attribute type changed', original, self)]
+        return []
 
     def __str__(self):
-        return 'Attribute'
+        return 'Attribute %s' % self._type
 
 
 class GeneratorSignature(LeafSignature):
@@ -197,14 +355,277 @@ class GeneratorSignature(LeafSignature):
         return 'Generator'
 
 
-def build_signature(target_path):
+Codec = namedtuple('Codec', ('magic', 'compressor', 'decompressor'))
+
+# Compression codecs for the signature files, detected on load from the
+# magic header of their format. Register a new one by adding it here.
+# Only the codecs available in this Python build are registered.
+CODECS = {}
+if zlib:
+    CODECS['zlib'] = Codec(b'\x78', zlib.compressobj, zlib.decompressobj)
+if bz2:
+    CODECS['bz2'] = Codec(b'BZh', bz2.BZ2Compressor, bz2.BZ2Decompressor)
+if lzma:
+    CODECS['lzma'] = Codec(b'\xfd7zXZ\x00', lzma.LZMACompressor,
+                           lzma.LZMADecompressor)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class _CompressWriter(io.RawIOBase):
+    """
+    Write-only stream compressing into fileobj
+    """
+
+    def __init__(self, fileobj, compressor):
+        self._fileobj = fileobj
+        self._compressor = compressor
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._fileobj.write(self._compressor.compress(data))
+        return len(data)
+
+    def finish(self):
+        """
+        Flush the compressor, fileobj is left open
+        """
+        self._fileobj.write(self._compressor.flush())
+
+
+class _DecompressReader(io.RawIOBase):
+    """
+    Read-only stream decompressing fileobj, head is the data already
+    consumed from fileobj to detect the codec
+    """
+
+    def __init__(self, fileobj, decompressor, head):
+        self._fileobj = fileobj
+        self._decompressor = decompressor
+        self._pending = head
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and self._pending is not None:
+            if self._decompressor.eof:
+                data = b''
+            else:
+                data = self._pending or self._fileobj.read(_CHUNK_SIZE)
+            self._pending = b''
+            if not data:
+                self._pending = None
+                break
+            self._buffer = self._decompressor.decompress(data)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def finish(self):
+        """
+        Consume the end of the compressed stream and, if fileobj is
+        seekable, give it back the data read past this end
+        """
+        while self.readinto(bytearray(_CHUNK_SIZE)):
+            pass
+        unused = getattr(self._decompressor, 'unused_data', b'')
+        seekable = getattr(self._fileobj, 'seekable', None)
+        if unused and seekable and seekable():
+            self._fileobj.seek(-len(unused), io.SEEK_CUR)
+
+
+class _PrefixedReader:
+    """
+    Unbuffered reader serving head (the data already consumed from fileobj
+    to detect the codec) then fileobj, so fileobj is left right after the
+    data actually unpickled
+    """
+
+    def __init__(self, fileobj, head):
+        self._fileobj = fileobj
+        self._head = head
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data, self._head = self._head + self._fileobj.read(), b''
+            return data
+        data, self._head = self._head[:size], self._head[size:]
+        if len(data) < size:
+            data += self._fileobj.read(size - len(data))
+        return data
+
+    def readline(self):
+        index = self._head.find(b'\n')
+        if index >= 0:
+            line, self._head = self._head[:index + 1], self._head[index + 1:]
+            return line
+        line, self._head = self._head, b''
+        return line + self._fileobj.readline()
+
+
+def _open_writer(fileobj, codec):
+    if codec is None:
+        return fileobj
+    try:
+        compressor = CODECS[codec].compressor()
+    except KeyError:
+        raise ValueError('Codec "%s" is not available (available: %s)' % (
+            codec, ', '.join(sorted(CODECS))))
+    return _CompressWriter(fileobj, compressor)
+
+
+def _close_writer(writer):
+    if isinstance(writer, _CompressWriter):
+        writer.finish()
+
+
+def _open_reader(fileobj):
+    # Read the header byte per byte and stop as soon as no codec's magic
+    # can match, so a raw pickle is not consumed past its end
+    head = b''
+    codecs = list(CODECS.values())
+    while codecs:
+        byte = fileobj.read(1)
+        if not byte:
+            break
+        head += byte
+        codecs = [c for c in codecs if c.magic[:len(head)] == head]
+        for codec in codecs:
+            if codec.magic == head:
+                return io.BufferedReader(
+                    _DecompressReader(fileobj, codec.decompressor(), head))
+    return _PrefixedReader(fileobj, head)
+
+
+def _close_reader(reader):
+    if isinstance(reader, io.BufferedReader):
+        reader.raw.finish()
+
+
+def dump(obj, fileobj, protocol=None, codec=None, **kwargs):
+    """
+    Pickle obj into fileobj, other arguments are passed to :func pickle.dump:
+    :arg codec: name of the :data CODECS: entry used to compress the data,
+    None to leave it uncompressed
+    """
+    writer = _open_writer(fileobj, codec)
+    pickle.dump(obj, writer, protocol, **kwargs)
+    _close_writer(writer)
+
+
+def dumps(obj, protocol=None, codec=None, **kwargs):
+    """
+    Same as :func dump: but return the data as bytes
+    """
+    fileobj = io.BytesIO()
+    dump(obj, fileobj, protocol, codec=codec, **kwargs)
+    return fileobj.getvalue()
+
+
+def load(fileobj, **kwargs):
+    """
+    Unpickle an object written by :func dump:, the codec is detected
+    from the data, other arguments are passed to :func pickle.load:
+
+    fileobj is left right after the data read, except for compressed data
+    in a non-seekable fileobj where up to a chunk past it can be consumed
+    """
+    reader = _open_reader(fileobj)
+    obj = pickle.load(reader, **kwargs)
+    _close_reader(reader)
+    return obj
+
+
+def loads(data, **kwargs):
+    """
+    Same as :func load: but read the data from bytes
+    """
+    return load(io.BytesIO(data), **kwargs)
+
+
+def build_signature(target_path, argspec_cache=None):
     """
     Generate a :class Signature: representing the element at target_path
     :arg target_path: dotted path to the element, can contain a final `:`
     to point on a package attribute
+    :arg argspec_cache: optional dict used to cache the functions' argspecs,
+    pass the same dict to several calls to share it between builds
+    """
+    target = import_string(target_path)
+    if argspec_cache is None:
+        argspec_cache = {}
+    with _argspec_cache_scope(argspec_cache):
+        return signature_factory(target)
+
+
+def _snapshot_node(fileobj, path, target, written):
+    if not (inspect.ismodule(target) or inspect.isclass(target)):
+        pickle.dump(('leaf', path, signature_factory(target)), fileobj)
+        return
+    if id(target) in written:
+        # Node already reachable through another path
+        pickle.dump(('ref', path, written[id(target)][1]), fileobj)
+        return
+    # Keep target alive so its id cannot be reused during the walk
+    written[id(target)] = (target, path)
+    # Only keep the node's name, children are streamed separately
+    if inspect.ismodule(target):
+        shell = ModuleSignature()
+    else:
+        shell = ClassSignature()
+    Signature.build_signature(shell, target)
+    pickle.dump(('node', path, shell), fileobj)
+    for attr, value in NodeSignature.public_members(target):
+        _snapshot_node(fileobj, path + (attr, ), value, written)
+
+
+def snapshot_to(target_path, fileobj, argspec_cache=None, codec=None):
+    """
+    Stream the :class Signature: of the element at target_path into fileobj
+
+    Each node is written as soon as it is built, so unlike
+    :func build_signature: + :func dump: the whole tree is never kept in
+    memory. Use :func load_snapshot: to read the result back.
+    :arg target_path: dotted path to the element, can contain a final `:`
+    to point on a package attribute
+    :arg fileobj: binary file-like object to write into
+    :arg argspec_cache: see :func build_signature:, unlike it no cache
+    is used by default to keep the memory flat
+    :arg codec: see :func dump:
     """
     target = import_string(target_path)
-    return signature_factory(target)
+    writer = _open_writer(fileobj, codec)
+    # One pickle per record, so no pickler memo grows along the walk
+    with _argspec_cache_scope(argspec_cache):
+        _snapshot_node(writer, (), target, {})
+    pickle.dump(('end', None, None), writer)
+    _close_writer(writer)
+
+
+def load_snapshot(fileobj):
+    """
+    Rebuild the :class Signature: written by :func snapshot_to:
+    :arg fileobj: binary file-like object to read from, left as with
+    :func load:
+    """
+    reader = _open_reader(fileobj)
+    nodes = {}
+    while True:
+        kind, path, value = pickle.load(reader)
+        if kind == 'end':
+            _close_reader(reader)
+            return nodes[()]
+        if kind == 'ref':
+            value = nodes[value]
+        if kind != 'leaf' or not path:
+            nodes[path] = value
+        if path:
+            nodes[path[:-1]]._signature[path[-1]] = value
 
 
 def check_signature(target_path, signature):
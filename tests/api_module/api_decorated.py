@@ -0,0 +1,45 @@
+import functools
+
+
+def decorator(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+    return wrapper
+
+
+@decorator
+def decorated1(arg1):
+    pass
+
+
+@decorator
+def decorated2(arg1, arg2):
+    pass
+
+
+@decorator
+def decorated3(arg1: int):
+    pass
+
+
+def make_closure():
+    def closure(arg1):
+        pass
+    return closure
+
+
+closure1 = make_closure()
+closure2 = make_closure()
+closure3 = make_closure()
+
+
+def make_kwonly_closure(value):
+    def kwonly_closure(*, arg1=value):
+        pass
+    return kwonly_closure
+
+
+# Equal defaults (`1 == True`) but different types
+kwonly_closure_bool = make_kwonly_closure(True)
+kwonly_closure_int = make_kwonly_closure(1)
@@ -5,6 +5,8 @@ try:
 except ImportError:
     from imp import reload
 import tempfile
+import threading
+import json
 
 
 def test_basic():
@@ -122,3 +124,186 @@ class TestChangingApi(BaseTest):
         self.api_module.api_package1.ApiPackage1Class1 = saved1
         del self.api_module.api_package1.new_var
         del self.api_module.api_package2
+
+
+def test_builtin_function_signature():
+    signature = samarche.build_signature("builtins:len")
+    assert isinstance(signature, samarche.FunctionSignature)
+    assert signature._built_in_function
+    assert signature._signature["args"] == ["obj"]
+    samarche.check_signature("builtins:len", signature)
+
+
+def test_opaque_function_signature():
+    def opaque():
+        pass
+    # Makes `inspect.getfullargspec` fail
+    opaque.__signature__ = 'broken'
+    signature = samarche.signature_factory(opaque)
+    assert signature._built_in_function
+    assert signature._signature is None
+    assert str(signature) == 'Function opaque <built-in function>'
+
+
+def test_argspec_cache():
+    cache = {}
+    signature = samarche.build_signature(
+        "api_module.api_package1:ApiPackage1_function1", argspec_cache=cache)
+    import api_module.api_package1
+    code = api_module.api_package1.ApiPackage1_function1.__code__
+    assert code in cache
+    signature2 = samarche.build_signature(
+        "api_module.api_package1:ApiPackage1_function1", argspec_cache=cache)
+    assert signature._signature is signature2._signature
+
+
+def test_argspec_cache_per_thread():
+    main_cache = {}
+    thread_cache = {}
+    with samarche._argspec_cache_scope(main_cache):
+        thread = threading.Thread(target=samarche.build_signature, args=(
+            "api_module.api_package1:ApiPackage1_function1", thread_cache))
+        thread.start()
+        thread.join()
+        assert samarche._current_argspec_cache() is main_cache
+    assert not main_cache
+    assert len(thread_cache) == 1
+
+
+def test_argspec_cache_shared_code(monkeypatch):
+    calls = []
+    build_argspec = samarche._build_argspec
+
+    def counting_build_argspec(target):
+        if target.__module__ == 'api_module.api_decorated':
+            calls.append(target.__name__)
+        return build_argspec(target)
+
+    monkeypatch.setattr(samarche, '_build_argspec', counting_build_argspec)
+    signature = samarche.build_signature("api_module.api_decorated")
+    # The wrappers share their code, only the annotated one differs
+    assert sorted(calls) == ['closure', 'decorated1', 'decorated3',
+                             'decorator', 'kwonly_closure', 'kwonly_closure',
+                             'make_closure', 'make_kwonly_closure']
+    assert (signature._signature['decorated1']._signature is
+            signature._signature['decorated2']._signature)
+    for name, default_type in (('kwonly_closure_bool', 'bool'),
+                               ('kwonly_closure_int', 'int')):
+        kwonlydefaults = signature._signature[name]._signature[
+            'kwonlydefaults']
+        assert kwonlydefaults['arg1']._type == default_type
+
+
+def test_snapshot():
+    for target in ["api_module", "json",
+                   "api_module.api_package1:ApiPackage1_function1"]:
+        tmp = tempfile.TemporaryFile(mode='w+b')
+        samarche.snapshot_to(target, tmp)
+        tmp.seek(0)
+        signature = samarche.load_snapshot(tmp)
+        assert not signature.validate(samarche.build_signature(target))
+        samarche.check_signature(target, signature)
+
+
+def test_snapshot_no_argspec_cache(monkeypatch):
+    caches = []
+    build_argspec = samarche._build_argspec
+
+    def spying_build_argspec(target):
+        caches.append(samarche._current_argspec_cache())
+        return build_argspec(target)
+
+    monkeypatch.setattr(samarche, '_build_argspec', spying_build_argspec)
+    samarche.snapshot_to("json", tempfile.TemporaryFile(mode='w+b'))
+    assert caches and all(c is None for c in caches)
+    cache = {}
+    samarche.snapshot_to("json", tempfile.TemporaryFile(mode='w+b'),
+                         argspec_cache=cache)
+    assert cache
+
+
+def test_snapshot_shared_node():
+    import api_module
+    import api_module.api_package1
+    api_module.api_package2 = api_module.api_package1
+    try:
+        tmp = tempfile.TemporaryFile(mode='w+b')
+        samarche.snapshot_to("api_module", tmp)
+        tmp.seek(0)
+        signature = samarche.load_snapshot(tmp)
+        assert (signature._signature['api_package1'] is
+                signature._signature['api_package2'])
+        samarche.check_signature("api_module", signature)
+    finally:
+        del api_module.api_package2
+
+
+@pytest.mark.parametrize('codec', [None] + sorted(samarche.CODECS))
+def test_dump_codec(codec):
+    signature = samarche.build_signature("json")
+    tmp = tempfile.TemporaryFile(mode='w+b')
+    samarche.dump(signature, tmp, codec=codec)
+    tmp.seek(0)
+    signature_loaded = samarche.load(tmp)
+    assert not signature_loaded.validate(signature)
+    data = samarche.dumps(signature, codec=codec)
+    if codec:
+        assert data.startswith(samarche.CODECS[codec].magic)
+    else:
+        assert data.startswith(b'\x80')
+    assert not samarche.loads(data).validate(signature)
+
+
+def test_dump_protocol():
+    signature = samarche.build_signature("api_module")
+    for codec in [None] + sorted(samarche.CODECS):
+        tmp = tempfile.TemporaryFile(mode='w+b')
+        samarche.dump(signature, tmp, protocol=2, codec=codec)
+        tmp.seek(0)
+        assert not samarche.load(tmp).validate(signature)
+    assert samarche.dumps(signature, 2).startswith(b'\x80\x02')
+
+
+@pytest.mark.parametrize('codec', [None] + sorted(samarche.CODECS))
+def test_load_back_to_back(codec):
+    tmp = tempfile.TemporaryFile(mode='w+b')
+    samarche.dump(1, tmp, codec=codec)
+    samarche.dump(2, tmp, codec=codec)
+    tmp.seek(0)
+    assert samarche.load(tmp) == 1
+    assert samarche.load(tmp) == 2
+    assert tmp.read() == b''
+
+
+@pytest.mark.parametrize('codec', sorted(samarche.CODECS))
+def test_snapshot_codec(codec):
+    tmp = tempfile.TemporaryFile(mode='w+b')
+    samarche.snapshot_to("json", tmp, codec=codec)
+    samarche.dump('next', tmp, codec=codec)
+    tmp.seek(0)
+    signature = samarche.load_snapshot(tmp)
+    samarche.check_signature("json", signature)
+    assert samarche.load(tmp) == 'next'
+
+
+def test_validation_error_changes():
+    import api_module.api_package1
+    original = samarche.build_signature("api_module")
+    api_module.api_package1.new_var1 = 'new_var1'
+    api_module.api_package1.new_var2 = 'new_var2'
+    try:
+        with pytest.raises(samarche.ValidationError) as exc:
+            samarche.check_signature("api_module", original)
+    finally:
+        del api_module.api_package1.new_var1
+        del api_module.api_package1.new_var2
+    changes = exc.value.changes
+    # Both members render the same but must not collide
+    assert [c.dotted_path for c in changes] == [
+        'api_package1.new_var1', 'api_package1.new_var2']
+    assert all(c.kind == 'unknown element' and c.original is None
+               for c in changes)
+    assert 'api_package1.new_var1: unknown element' in str(exc.value)
+    assert json.loads(exc.value.to_json())[1] == {
+        'path': 'api_package1.new_var2', 'kind': 'unknown element',
+        'original': None, 'current': 'Attribute str'}